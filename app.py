@@ -1,38 +1,98 @@
 import os
 import json
 import base64
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from functools import lru_cache, wraps
+from itertools import islice
+from typing import Annotated, Optional
+import click
+import msgspec
+import orjson
+from flask import Flask, request, jsonify, Response, send_from_directory
+from flask import json as flask_json
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO
+
+# Under the gevent worker, let gRPC use cooperative sockets so the shared
+# Firestore channel doesn't block the hub. Must run before any channel exists.
+try:
+    from gevent import monkey
+    if monkey.is_module_patched("socket"):
+        from grpc.experimental import gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+except ImportError:
+    pass
+
 import firebase_admin
 from firebase_admin import credentials, firestore
 from google.api_core.exceptions import FailedPrecondition
 
 # ----------------- Flask & SocketIO -----------------
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
+
+
 app = Flask(__name__)
-socketio = SocketIO(app, cors_allowed_origins="*")
+app.json = OrjsonProvider(app)
+# Route Socket.IO packets through app.json so they are encoded with orjson too.
+# Set REDIS_URL (requires the redis package) to share broadcasts across processes.
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    json=flask_json,
+    message_queue=os.environ.get("REDIS_URL"),
+)
 
 # ----------------- Admin credentials -----------------
 ADMIN_USER = os.environ.get("ADMIN_USER", "admin")
 ADMIN_PASS = os.environ.get("ADMIN_PASS", "con123")
 
 # ----------------- Firebase Init -----------------
-cred_data = None
-if os.environ.get("FIREBASE_CREDENTIALS"):
-    cred_data = json.loads(os.environ["FIREBASE_CREDENTIALS"])
-elif os.environ.get("FIREBASE_CREDENTIALS_B64"):
-    cred_data = json.loads(base64.b64decode(os.environ["FIREBASE_CREDENTIALS_B64"]))
+@lru_cache(maxsize=1)
+def _get_cred():
+    """Decode the service account credentials once per process."""
+    cred_data = None
+    if os.environ.get("FIREBASE_CREDENTIALS"):
+        cred_data = json.loads(os.environ["FIREBASE_CREDENTIALS"])
+    elif os.environ.get("FIREBASE_CREDENTIALS_B64"):
+        cred_data = json.loads(base64.b64decode(os.environ["FIREBASE_CREDENTIALS_B64"]))
 
-if not cred_data:
-    raise RuntimeError("Missing FIREBASE_CREDENTIALS or FIREBASE_CREDENTIALS_B64 environment variable")
+    if not cred_data:
+        raise RuntimeError("Missing FIREBASE_CREDENTIALS or FIREBASE_CREDENTIALS_B64 environment variable")
+
+    return credentials.Certificate(cred_data)
 
-cred = credentials.Certificate(cred_data)
 
 if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred)
+    firebase_admin.initialize_app(_get_cred())
 
 db = firestore.client()
 
+# Query objects are immutable, so hot base queries are built once and shared
+PENDING_BOOKINGS = db.collection("bookings").where("status", "==", "pending")
+APPROVED_BOOKINGS = db.collection("bookings").where("status", "==", "approved")
+
+# Firestore caps a WriteBatch at 500 writes
+BATCH_WRITE_LIMIT = 500
+# Bookings approved per transaction; each one costs an availability query
+APPROVE_TRANSACTION_SIZE = 50
+
 # ----------------- Default Rooms -----------------
 DEFAULT_ROOMS = [
     "CSSE Conference Hall 1",
@@ -42,30 +102,434 @@ DEFAULT_ROOMS = [
     "Board Room",
 ]
 
-# Ensure default rooms exist
-rooms_ref = db.collection("rooms")
-existing = [r.to_dict().get("name") for r in rooms_ref.stream()]
-for room in DEFAULT_ROOMS:
-    if room not in existing:
-        rooms_ref.document().set({"name": room, "available": True})
+_seed_lock = threading.Lock()
+_seeded = False
+
+
+def ensure_default_rooms():
+    """Create any missing default rooms, at most once per process.
+
+    Set SEED_DONE once the rooms exist to skip the check entirely.
+    """
+    global _seeded
+    if _seeded or os.environ.get("SEED_DONE"):
+        return
+    with _seed_lock:
+        if _seeded:
+            return
+        rooms_ref = db.collection("rooms")
+        # Only look up the default names; rooms seeded before deterministic
+        # ids were introduced have random ids, so they must be matched by name.
+        defaults = rooms_ref.where("name", "in", DEFAULT_ROOMS).select(["name"])
+        existing = {r.to_dict().get("name") for r in defaults.stream()}
+        missing = [room for room in DEFAULT_ROOMS if room not in existing]
+        if missing:
+            # Deterministic ids make concurrent seeding by several workers idempotent
+            batch = db.batch()
+            for room in missing:
+                doc_id = hashlib.sha1(room.encode()).hexdigest()[:20]
+                batch.set(rooms_ref.document(doc_id), {"name": room, "available": True}, merge=True)
+            batch.commit()
+        _seeded = True
+
+
+@app.cli.command("seed-rooms")
+def seed_rooms_command():
+    """Create the default rooms in Firestore."""
+    ensure_default_rooms()
+
+
+@app.cli.command("backfill-timestamps")
+def backfill_timestamps_command():
+    """Add startsAt/endsAt to bookings created before those fields existed."""
+    batch = db.batch()
+    pending = 0
+    fields = ["startsAt", "startDate", "startTime", "endDate", "endTime"]
+    for booking in paged(db.collection("bookings").select(fields)):
+        b = booking.to_dict()
+        if "startsAt" in b:
+            continue
+        starts_at = padded_timestamp_key(b.get("startDate"), b.get("startTime"))
+        ends_at = padded_timestamp_key(b.get("endDate"), b.get("endTime"))
+        if starts_at is None or ends_at is None:
+            click.echo(f"Skipping booking {booking.id}: unparseable date or time")
+            continue
+        batch.update(booking.reference, {"startsAt": starts_at, "endsAt": ends_at})
+        pending += 1
+        if pending == BATCH_WRITE_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if pending:
+        batch.commit()
 
 # ----------------- Helpers -----------------
-def check_room_availability(rooms, start_date, end_date, start_time, end_time):
-    """Check if rooms are available within a date/time range."""
+# Zero-padded so startsAt/endsAt sort correctly as strings
+Date = Annotated[str, msgspec.Meta(pattern=r"^\d{4}-\d{2}-\d{2}\Z")]
+TimeOfDay = Annotated[str, msgspec.Meta(pattern=r"^\d{2}:\d{2}\Z")]
+
+
+class BookingIn(msgspec.Struct):
+    """Request body accepted by POST /book."""
+    eventName: str
+    rooms: Annotated[list[str], msgspec.Meta(min_length=1)]
+    startDate: Date
+    endDate: Date
+    startTime: TimeOfDay
+    endTime: TimeOfDay
+    participants: int = 1
+    department: Optional[str] = None
+    notes: Optional[str] = None
+
+
+class LoginIn(msgspec.Struct):
+    """Request body accepted by POST /admin/login."""
+    username: str
+    password: str
+
+
+class BookingIdsIn(msgspec.Struct):
+    """Request body accepted by POST /admin/approve_bulk."""
+    ids: list[str]
+
+
+# Firestore rejects array_contains_any with more than 30 values
+ARRAY_CONTAINS_ANY_LIMIT = 30
+# Beyond this many chunks, scan the date window once instead
+MAX_ROOM_CHUNKS = 3
+
+# Shared pool for fanning out independent Firestore reads
+_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("QUERY_WORKERS", 8)))
+
+
+def _chunks(items, size):
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def paged(query, size=500):
+    """Yield every document matching ``query``, fetched ``size`` at a time.
+
+    Each page is a separate short read, so long scans neither hold one
+    stream open nor buffer the whole result.
+    """
+    query = query.order_by("__name__").limit(size)
+    cursor = None
+    while True:
+        page = query.start_after(cursor) if cursor else query
+        docs = list(page.stream())
+        yield from docs
+        if len(docs) < size:
+            break
+        cursor = docs[-1]
+
+
+# ----------------- Response cache -----------------
+# Short-lived cache for read endpoints; writes clear it explicitly
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 5))
+# Least recently used entries are evicted past this size, so arbitrary
+# query strings can't grow the cache without bound between writes
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 256))
+_cache = OrderedDict()
+# Bumped on every invalidation so reads that straddle a write aren't stored
+_cache_ver = 0
+_cache_lock = threading.Lock()
+
+
+def cached(view):
+    """Cache a read-only view's response per path and query string.
+
+    Successful responses also carry a weak ETag so browsers can revalidate
+    with a 304 instead of downloading the body.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        now = time.monotonic()
+        with _cache_lock:
+            entry = _cache.get(key)
+            version = _cache_ver
+            if entry:
+                if now < entry[0]:
+                    _cache.move_to_end(key)
+                else:
+                    del _cache[key]
+        if entry and now < entry[0]:
+            _, body, status, mimetype, etag = entry
+            resp = Response(body, status=status, mimetype=mimetype)
+        else:
+            resp = app.make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+            body = resp.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            with _cache_lock:
+                if _cache_ver == version:
+                    _cache[key] = (now + CACHE_TTL, body, resp.status_code, resp.mimetype, etag)
+                    _cache.move_to_end(key)
+                    while len(_cache) > CACHE_MAX_ENTRIES:
+                        _cache.popitem(last=False)
+
+        # no-cache: clients refetch right after update_events, so they must
+        # always revalidate; the ETag keeps that a cheap 304
+        resp.set_etag(etag, weak=True)
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+    return wrapper
+
+
+def clear_cache():
+    global _cache_ver
+    with _cache_lock:
+        _cache.clear()
+        _cache_ver += 1
+
+
+def notify_update(change):
+    """Drop cached reads and send ``change`` to connected clients.
+
+    ``change`` describes the write (``op`` plus the booking id, or ``ids``
+    for ``status_bulk``, and any new values) so clients can patch their
+    local state instead of refetching.
+    """
+    clear_cache()
+    _emit_queue.put(("update_events", change))
+
+
+# ----------------- Background emitter -----------------
+# Broadcasts are drained by a background task so handlers don't wait on fan-out.
+# The queue comes from Engine.IO so it matches the async mode (gevent or
+# threading) whether or not the stdlib has been monkey-patched.
+_emit_queue = socketio.server.eio.create_queue()
+_emitter_lock = threading.Lock()
+_emitter_started = False
+
+
+def _emitter():
+    while True:
+        event, payload = _emit_queue.get()
+        try:
+            socketio.emit(event, payload)
+        except Exception:
+            app.logger.exception("Failed to emit %s", event)
+
+
+def start_emitter():
+    """Start the background emitter task, once per process."""
+    global _emitter_started
+    with _emitter_lock:
+        if not _emitter_started:
+            socketio.start_background_task(_emitter)
+            _emitter_started = True
+
+
+# ----------------- Rooms cache -----------------
+# Kept current by a Firestore snapshot listener; None until the first snapshot
+ROOMS_CACHE = None
+# ROOMS_CACHE pre-serialized for the unfiltered /rooms fast path
+ROOMS_JSON_CACHE = None
+_rooms_lock = threading.Lock()
+_rooms_watch = None
+
+
+def _rooms_callback(col_snapshot, changes, read_time):
+    global ROOMS_CACHE, ROOMS_JSON_CACHE
+    rooms = []
+    for r in col_snapshot:
+        doc = r.to_dict()
+        doc['id'] = r.id
+        doc.setdefault('available', True)
+        rooms.append(doc)
+    rooms_json = orjson.dumps(rooms)
+    with _rooms_lock:
+        ROOMS_CACHE = rooms
+        ROOMS_JSON_CACHE = rooms_json
+    clear_cache()
+
+
+def watch_rooms():
+    """Start the rooms snapshot listener, once per process."""
+    global _rooms_watch
+    with _rooms_lock:
+        if _rooms_watch is None:
+            _rooms_watch = db.collection("rooms").on_snapshot(_rooms_callback)
+
+
+def list_rooms():
+    """Return fresh copies of all room dicts, from the cache when loaded."""
+    with _rooms_lock:
+        rooms = ROOMS_CACHE
+    if rooms is None:
+        rooms = []
+        for r in db.collection("rooms").stream():
+            doc = r.to_dict()
+            doc['id'] = r.id
+            doc.setdefault('available', True)
+            rooms.append(doc)
+    return [dict(doc) for doc in rooms]
+
+
+# ----------------- Approved bookings cache -----------------
+# Approved bookings by id, projected to what the /rooms overlap check needs.
+# Kept current by a snapshot listener; None until the first snapshot.
+APPROVED_CACHE = None
+# Only bookings ending on or after this date are watched, so the cache can
+# answer windows starting from it onwards
+APPROVED_CACHE_SINCE = None
+_approved_lock = threading.Lock()
+_approved_watch = None
+
+
+def _approved_callback(docs, changes, read_time):
+    global APPROVED_CACHE
+    with _approved_lock:
+        approved = {} if APPROVED_CACHE is None else APPROVED_CACHE
+        for change in changes:
+            if change.type.name == "REMOVED":
+                approved.pop(change.document.id, None)
+            else:
+                b = change.document.to_dict()
+                approved[change.document.id] = {field: b.get(field) for field in OVERLAP_FIELDS}
+        APPROVED_CACHE = approved
+    clear_cache()
+
+
+def update_approved_cache(approved=None, removed=()):
+    """Apply our own status changes to ``APPROVED_CACHE`` ahead of the listener.
+
+    ``notify_update`` makes clients refetch straight away, before the
+    snapshot listener has caught up with the write.
+    """
+    with _approved_lock:
+        if APPROVED_CACHE is None:
+            return
+        for booking_id, b in (approved or {}).items():
+            if (b.get("endsAt") or "") >= APPROVED_CACHE_SINCE:
+                APPROVED_CACHE[booking_id] = {field: b.get(field) for field in OVERLAP_FIELDS}
+        for booking_id in removed:
+            APPROVED_CACHE.pop(booking_id, None)
+
+
+def watch_approved():
+    """Start the approved-bookings snapshot listener, once per process."""
+    global _approved_watch, APPROVED_CACHE_SINCE
+    with _approved_lock:
+        if _approved_watch is None:
+            # A day of slack covers clients whose local date lags the server's
+            since = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+            query = APPROVED_BOOKINGS.where("endsAt", ">=", since)
+            APPROVED_CACHE_SINCE = since
+            _approved_watch = query.on_snapshot(_approved_callback)
+
+
+def count_documents(query):
+    """Count matching documents server-side without transferring them."""
+    return query.count().get()[0][0].value
+
+
+def timestamp_key(date, time_):
+    """Combine a date and time into a sortable ISO-8601 string."""
+    return f"{date}T{time_}"
+
+
+def padded_timestamp_key(date, time_):
+    """timestamp_key() for stored values that may not be zero-padded.
+
+    Returns None when the date or time can't be parsed.
+    """
     try:
-        query = (
-            db.collection("bookings")
-            .where("rooms", "array_contains_any", rooms)
-            .where("status", "==", "approved")
-            .where("startDate", "<=", end_date)
-            .where("endDate", ">=", start_date)
+        year, month, day = (int(part) for part in date.split("-"))
+        hour, minute = (int(part) for part in time_.split(":"))
+    except (AttributeError, ValueError):
+        return None
+    return timestamp_key(f"{year:04d}-{month:02d}-{day:02d}", f"{hour:02d}:{minute:02d}")
+
+
+# Booking fields needed by overlaps(); queries project to just these
+OVERLAP_FIELDS = ["rooms", "startsAt", "endDate", "startTime", "endTime"]
+
+
+def clock(time_):
+    """Turn an 'HH:MM' time into an HHMM int for cheap comparisons."""
+    return int(time_.replace(":", ""))
+
+
+def overlaps(b, start_date, end_key, start, end):
+    """Whether booking ``b`` clashes with the daily slot from ``start_date``
+    up to ``end_key`` (see timestamp_key()).
+
+    ``start`` and ``end`` are clock() values. Bookings with missing or
+    unparseable fields never clash, so one bad legacy document can't fail
+    every check.
+    """
+    try:
+        return (
+            b["startsAt"] < end_key
+            and b["endDate"] >= start_date
+            and not (end <= clock(b["startTime"]) or start >= clock(b["endTime"]))
         )
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return False
+
+
+def _find_conflict(rooms, start_date, end_date, start_time, end_time, scan=False, transaction=None):
+    """Return the first approved booking clashing with any of ``rooms``.
+
+    With ``scan`` the query drops the rooms filter and matches rooms in Python.
+    Pass ``transaction`` to read as part of it.
+    """
+    query = APPROVED_BOOKINGS
+    if not scan:
+        query = query.where("rooms", "array_contains_any", rooms)
+    # Keep a single range filter, on bookings that haven't ended before the
+    # window, so one composite index serves the query; overlaps() checks
+    # the start of each booking in Python.
+    query = (
+        query
+        .where("endsAt", ">=", start_date)
+        .select(OVERLAP_FIELDS)
+    )
 
-        overlapping_bookings = query.stream()
-        for booking in overlapping_bookings:
+    wanted = set(rooms)
+    end_key = timestamp_key(end_date, end_time)
+    start, end = clock(start_time), clock(end_time)
+    # Close the stream on early return so the gRPC call ends right away
+    with closing(query.stream(transaction=transaction)) as bookings:
+        for booking in bookings:
             b = booking.to_dict()
-            if not (end_time <= b["startTime"] or start_time >= b["endTime"]):
-                return False, f"Room(s) {rooms} already booked for overlapping time"
+            if wanted.intersection(b["rooms"]) and overlaps(b, start_date, end_key, start, end):
+                return b
+    return None
+
+
+def check_room_availability(rooms, start_date, end_date, start_time, end_time):
+    """Check if rooms are available within a date/time range."""
+    try:
+        rooms = list(dict.fromkeys(rooms))
+        chunks = list(_chunks(rooms, ARRAY_CONTAINS_ANY_LIMIT))
+        conflict = None
+        if len(chunks) == 1:
+            conflict = _find_conflict(chunks[0], start_date, end_date, start_time, end_time)
+        elif len(chunks) > MAX_ROOM_CHUNKS:
+            # One scan of the window beats fanning out many queries
+            conflict = _find_conflict(rooms, start_date, end_date, start_time, end_time, scan=True)
+        elif chunks:
+            # Query the chunks concurrently and stop at the first clash
+            futures = [
+                _pool.submit(_find_conflict, chunk, start_date, end_date, start_time, end_time)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                conflict = future.result()
+                if conflict:
+                    break
+            for future in futures:
+                future.cancel()
+
+        if conflict:
+            conflicts = sorted(set(conflict["rooms"]) & set(rooms))
+            return False, f"Room(s) {conflicts} already booked for overlapping time"
         return True, "Available"
 
     except FailedPrecondition as e:
@@ -73,75 +537,155 @@ def check_room_availability(rooms, start_date, end_date, start_time, end_time):
     except Exception as e:
         return False, f"Unexpected error: {str(e)}"
 
+def _booking_conflict(b, accepted, transaction):
+    """Return an approved booking, or one of ``accepted``, that clashes with ``b``."""
+    end_key = timestamp_key(b["endDate"], b["endTime"])
+    start, end = clock(b["startTime"]), clock(b["endTime"])
+    rooms = set(b["rooms"])
+    for other in accepted:
+        if rooms.intersection(other["rooms"]) and overlaps(other, b["startDate"], end_key, start, end):
+            return other
+    # A scan keeps this to one query per booking whatever its room count
+    return _find_conflict(
+        b["rooms"], b["startDate"], b["endDate"], b["startTime"], b["endTime"],
+        scan=True, transaction=transaction,
+    )
+
+
+@firestore.transactional
+def approve_in_transaction(transaction, booking_ids):
+    """Approve each of ``booking_ids`` whose rooms are still free.
+
+    The availability reads and the status updates share one transaction, so
+    two clashing bookings approved concurrently can't both succeed. Returns
+    ``(approved, errors)``: approved bookings by id, and the reason each
+    other id was skipped.
+    """
+    refs = [db.collection("bookings").document(booking_id) for booking_id in booking_ids]
+    snapshots = {snapshot.id: snapshot for snapshot in transaction.get_all(refs)}
+    approved, errors, updates = {}, {}, []
+    for booking_id, ref in zip(booking_ids, refs):
+        snapshot = snapshots.get(booking_id)
+        if snapshot is None or not snapshot.exists:
+            errors[booking_id] = "Booking not found"
+            continue
+        b = snapshot.to_dict()
+        b.setdefault("startsAt", timestamp_key(b.get("startDate"), b.get("startTime")))
+        b.setdefault("endsAt", timestamp_key(b.get("endDate"), b.get("endTime")))
+        if b.get("status") != "approved":
+            conflict = _booking_conflict(b, approved.values(), transaction)
+            if conflict:
+                conflicts = sorted(set(conflict["rooms"]) & set(b["rooms"]))
+                errors[booking_id] = f"Room(s) {conflicts} already booked for overlapping time"
+                continue
+            updates.append(ref)
+        approved[booking_id] = b
+    for ref in updates:
+        transaction.update(ref, {"status": "approved"})
+    return approved, errors
+
 # ----------------- Routes -----------------
+@app.before_request
+def lazy_init():
+    ensure_default_rooms()
+    watch_rooms()
+    watch_approved()
+    start_emitter()
+
+
 @app.route("/")
 def index():
-    return render_template("index.html")
+    # index.html has no template logic, so serve it as a cacheable file
+    return send_from_directory(
+        os.path.join(app.root_path, app.template_folder), "index.html", max_age=300
+    )
 
 
 @app.route("/rooms", methods=["GET"])
+@cached
 def get_rooms():
+    if not request.args:
+        with _rooms_lock:
+            rooms_json = ROOMS_JSON_CACHE
+        if rooms_json is not None:
+            return Response(rooms_json, mimetype="application/json")
+
     start_date = request.args.get("startDate")
     end_date = request.args.get("endDate")
     start_time = request.args.get("startTime")
     end_time = request.args.get("endTime")
 
-    rooms_ref = db.collection("rooms").stream()
-    rooms = []
-    for r in rooms_ref:
-        doc = r.to_dict()
-        doc['id'] = r.id
-        doc.setdefault('available', True)
-
-        if start_date and end_date and start_time and end_time:
-            available, _ = check_room_availability([doc['name']], start_date, end_date, start_time, end_time)
-            doc['available'] = available
-        rooms.append(doc)
+    filtered = start_date and end_date and start_time and end_time
+    busy = set()
+    if filtered:
+        try:
+            start, end = clock(start_time), clock(end_time)
+        except ValueError:
+            return jsonify({"success": False, "error": "Invalid startTime or endTime"}), 400
+        end_key = timestamp_key(end_date, end_time)
+        with _approved_lock:
+            if APPROVED_CACHE is not None and start_date >= APPROVED_CACHE_SINCE:
+                bookings = list(APPROVED_CACHE.values())
+            else:
+                bookings = None
+        if bookings is None:
+            # One query for the whole date window instead of one per room
+            query = APPROVED_BOOKINGS.where("endsAt", ">=", start_date).select(OVERLAP_FIELDS)
+            bookings = [booking.to_dict() for booking in query.stream()]
+        for b in bookings:
+            if overlaps(b, start_date, end_key, start, end):
+                busy.update(b.get("rooms", []))
+
+    rooms = list_rooms()
+    if filtered:
+        for doc in rooms:
+            doc['available'] = doc['name'] not in busy
     return jsonify(rooms)
 
 
 @app.route("/book", methods=["POST"])
 def book_room():
-    data = request.json
-    if not data:
+    if not request.get_data():
         return jsonify({"success": False, "error": "Missing booking data"}), 400
+    try:
+        # strict=False accepts numeric strings, e.g. participants from a form input
+        data = msgspec.json.decode(request.get_data(), type=BookingIn, strict=False)
+    except msgspec.DecodeError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
     available, message = check_room_availability(
-        data.get("rooms", []),
-        data.get("startDate"),
-        data.get("endDate"),
-        data.get("startTime"),
-        data.get("endTime")
+        data.rooms,
+        data.startDate,
+        data.endDate,
+        data.startTime,
+        data.endTime
     )
 
     if not available:
         return jsonify({"success": False, "error": message}), 400
 
     doc_ref = db.collection("bookings").document()
-    booking = {
-        "eventName": data.get("eventName"),
-        "rooms": data.get("rooms", []),
-        "startDate": data.get("startDate"),
-        "endDate": data.get("endDate"),
-        "startTime": data.get("startTime"),
-        "endTime": data.get("endTime"),
-        "participants": data.get("participants", 1),
-        "department": data.get("department"),
-        "notes": data.get("notes"),
-        "status": "pending",
-        "createdAt": datetime.now().isoformat()
-    }
-    doc_ref.set(booking)
-    socketio.emit('update_events')
+    booking = msgspec.structs.asdict(data)
+    booking["status"] = "pending"
+    booking["createdAt"] = firestore.SERVER_TIMESTAMP
+    booking["startsAt"] = timestamp_key(booking["startDate"], booking["startTime"])
+    booking["endsAt"] = timestamp_key(booking["endDate"], booking["endTime"])
+    result = doc_ref.set(booking)
+    # The sentinel resolves to the commit time, which the write result reports
+    booking["createdAt"] = result.update_time.isoformat()
+    # Only the id and status: Socket.IO clients are unauthenticated and the
+    # booking's details (notes, department, ...) aren't public
+    notify_update({"op": "create", "id": doc_ref.id, "status": "pending"})
     return jsonify({"success": True, "id": doc_ref.id, "booking": booking})
 
 
 @app.route("/admin/login", methods=["POST"])
 def admin_login():
-    data = request.json
-    if not data:
+    try:
+        data = msgspec.json.decode(request.get_data(), type=LoginIn)
+    except msgspec.DecodeError:
         return jsonify({"success": False, "error": "Missing credentials"}), 400
-    if data.get("username") == ADMIN_USER and data.get("password") == ADMIN_PASS:
+    if data.username == ADMIN_USER and data.password == ADMIN_PASS:
         return jsonify({"success": True})
     return jsonify({"success": False, "error": "Invalid credentials"}), 401
 
@@ -149,18 +693,49 @@ def admin_login():
 @app.route("/admin/approve/<booking_id>", methods=["POST"])
 def approve_booking(booking_id):
     try:
-        db.collection("bookings").document(booking_id).update({"status": "approved"})
-        socketio.emit("update_events")
-        return jsonify({"success": True})
+        approved, errors = approve_in_transaction(db.transaction(), [booking_id])
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
+    if booking_id in errors:
+        return jsonify({"success": False, "error": errors[booking_id]}), 400
+    update_approved_cache(approved)
+    notify_update({"op": "status", "id": booking_id, "status": "approved"})
+    return jsonify({"success": True})
+
+
+@app.route("/admin/approve_bulk", methods=["POST"])
+def approve_bookings_bulk():
+    try:
+        ids = msgspec.json.decode(request.get_data(), type=BookingIdsIn).ids
+    except msgspec.DecodeError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if not ids:
+        return jsonify({"success": False, "error": "Missing booking ids"}), 400
+    ids = list(dict.fromkeys(ids))
+    approved, errors = {}, {}
+    try:
+        for chunk in _chunks(ids, APPROVE_TRANSACTION_SIZE):
+            chunk_approved, chunk_errors = approve_in_transaction(db.transaction(), chunk)
+            approved.update(chunk_approved)
+            errors.update(chunk_errors)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e), "approved": list(approved), "errors": errors}), 500
+    finally:
+        # Earlier transactions stay committed if a later one fails; announce them
+        if approved:
+            update_approved_cache(approved)
+            notify_update({"op": "status_bulk", "ids": list(approved), "status": "approved"})
+    if errors:
+        return jsonify({"success": False, "approved": list(approved), "errors": errors}), 400
+    return jsonify({"success": True})
 
 
 @app.route("/admin/reject/<booking_id>", methods=["POST"])
 def reject_booking(booking_id):
     try:
         db.collection("bookings").document(booking_id).update({"status": "rejected"})
-        socketio.emit("update_events")
+        update_approved_cache(removed=[booking_id])
+        notify_update({"op": "status", "id": booking_id, "status": "rejected"})
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -170,17 +745,26 @@ def reject_booking(booking_id):
 def delete_booking(booking_id):
     try:
         db.collection("bookings").document(booking_id).delete()
-        socketio.emit("update_events")
+        update_approved_cache(removed=[booking_id])
+        notify_update({"op": "delete", "id": booking_id})
         return jsonify({"success": True})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
 @app.route("/stats", methods=["GET"])
+@cached
 def get_stats():
-    pending = len(list(db.collection('bookings').where('status', '==', 'pending').stream()))
-    approved = len(list(db.collection('bookings').where('status', '==', 'approved').stream()))
-    total_rooms = len(list(db.collection('rooms').stream()))
+    queries = {'pending': PENDING_BOOKINGS, 'approved': APPROVED_BOOKINGS}
+    with _rooms_lock:
+        rooms = ROOMS_CACHE
+    if rooms is None:
+        queries['total_rooms'] = db.collection('rooms')
+
+    # The counts are independent, so run them concurrently
+    counts = dict(zip(queries, _pool.map(count_documents, queries.values())))
+    pending, approved = counts['pending'], counts['approved']
+    total_rooms = len(rooms) if rooms is not None else counts['total_rooms']
     return jsonify({"pending": pending, "approved": approved, "total_rooms": total_rooms})
 
 